@@ -3,6 +3,7 @@
 
 import os
 import re
+from collections.abc import Iterator
 from pathlib import Path
 
 ROOT = Path(__file__).resolve().parent.parent  # src directory
@@ -23,128 +24,114 @@ LOADER_IIFE_RE = re.compile(
     re.S,
 )
 
+TARGET_RE = re.compile(r"^//@target illustrator\s*$", re.M)
+PREF_RE = re.compile(r"^app\.preferences\.setBooleanPreference\('ShowExternalJSXWarning',[^\n]*\)\s*;?\s*$", re.M)
+HEADER_RE = re.compile(r"^/\*\*[\s\S]*?\*/\s*")
+IIFE_RE = re.compile(r"\(function\(\)\s*\{([\s\S]*?)\}\)\(\);")
+MAIN_CALL_RE = re.compile(r"\bmain\s*\(\s*\)\s*;")
+VALIDATE_RE = re.compile(r"validateEnvironment\s*\(\s*\)")
+DOC_GUARD_RE = re.compile(r"if\s*\(\s*!\s*AIS\.Document\.hasDocument\(\)\s*\)\s*\{([\s\S]*?)\}")
+SEL_GUARD_RE = re.compile(r"if\s*\(\s*!\s*AIS\.Document\.hasSelection\(\)\s*\)\s*\{([\s\S]*?)\}")
+ALERT_RE = re.compile(r"alert\((.*?)\)\s*;", re.S)
+VALIDATE_ALERT_RE = re.compile(r"alert\((.*?)\);", re.S)
+SCRIPTNAME_RE = re.compile(r"scriptName\s*:\s*([\'\"])(.*?)\1")
+RETURN_RE = re.compile(r"\breturn\s*;")
+
 
 LOADER_STANDALONE = (
     "var c=File(Folder.myDocuments+\"/Adobe Scripts/vexy-ville.ini\");"
     "if(c.exists){c.open('r');var p=c.read();c.close();var l=File(p+\".lib/core.jsx\");if(l.exists)$.evalFile(l.fsName);}"
 )
 
+TARGET_LINE = "//@target illustrator"
+PREF_LINE = "app.preferences.setBooleanPreference('ShowExternalJSXWarning', false);"
+CANONICAL_BLOCK = TARGET_LINE + "\n" + LOADER_STANDALONE + "\n" + PREF_LINE + "\n"
+
+EXECUTE_HEADER = (
+    "\n// ============================================================================\n"
+    "// EXECUTE\n"
+    "// ============================================================================\n\n"
+)
+# Templates take the error title as {0}; literal JSX braces are doubled
+GUARDED_MAIN = "    try {{\n        main();\n    }} catch (e) {{\n        AIS.Error.show('{0}', e);\n    }}\n}}\n"
+UNGUARDED_MAIN = "try {{\n    main();\n}} catch (e) {{\n    AIS.Error.show('{0}', e);\n}}\n"
+
+
+def is_canonical_at(text: str, start: int) -> bool:
+    """Return True if the canonical trio sits at `start` and ensure_target_and_loader would keep the text as-is."""
+    end = start + len(CANONICAL_BLOCK)
+    if not text.startswith(CANONICAL_BLOCK, start) or (start and text[start - 1] != "\n"):
+        return False
+    # Any other loader, or an earlier target/pref line, would be rewritten
+    if text.count("vexy-ville.ini") != 1 or TARGET_LINE in text[:start] or "ShowExternalJSXWarning" in text[:start]:
+        return False
+    # PREF_RE's trailing \s*$ may swallow blank lines after the block; only skip if it stops at the block end
+    m = PREF_RE.match(text, end - len(PREF_LINE) - 1)
+    return m is not None and m.end() == end
+
 
 def ensure_target_and_loader(text: str) -> str:
     """Ensure //@target, loader (standalone), and preference ordering.
     Canonical order after header: //@target illustrator, loader, app.preferences line.
     """
-    original = text
+    # Fast path: canonical trio already in place (wherever the target line sits)
+    start = text.find(CANONICAL_BLOCK)
+    if start != -1 and is_canonical_at(text, start):
+        return text
 
     # Strip loader IIFE and any standalone loader occurrences
     text = LOADER_IIFE_RE.sub("", text)
     text = text.replace(LOADER_STANDALONE + "\n", "")
     text = text.replace("\n" + LOADER_STANDALONE, "")
 
-    has_target = re.search(r"^//@target illustrator\s*$", text, re.M) is not None
-    has_pref = re.search(r"^app\.preferences\.setBooleanPreference\('ShowExternalJSXWarning',[^\n]*\)\s*;?\s*$", text, re.M) is not None
+    # Plain substring checks rule out the common "missing" case before running the line-anchored regexes
+    mt = TARGET_RE.search(text) if TARGET_LINE in text else None
+    mpref = PREF_RE.search(text) if "ShowExternalJSXWarning" in text else None
 
     # If we have an existing target and pref, replace the block from target..pref with canonical trio
-    mt = re.search(r"^//@target illustrator\s*$", text, re.M)
-    mpref = re.search(r"^app\.preferences\.setBooleanPreference\('ShowExternalJSXWarning',[^\n]*\)\s*;?\s*$", text, re.M)
     if mt and mpref:
-        start = mt.start()
-        end = mpref.end()
-        text = (
-            text[:start]
-            + "//@target illustrator\n"
-            + LOADER_STANDALONE
-            + "\n"
-            + "app.preferences.setBooleanPreference('ShowExternalJSXWarning', false);\n"
-            + text[end:]
-        )
-        return text
+        return "".join((text[:mt.start()], CANONICAL_BLOCK, text[mpref.end():]))
 
-    # Otherwise, insert canonical trio after the header block
-    m_header = re.search(r"^/\*\*[\s\S]*?\*/\s*", text)
+    # Otherwise, insert canonical trio after the header block.
+    # The target is inserted even if one exists (pref missing) to ensure order.
+    m_header = HEADER_RE.match(text)
     insert_pos = m_header.end() if m_header else 0
-    insert_lines = []
-    if not has_target:
-        insert_lines.append("//@target illustrator")
-    else:
-        # If target exists but pref missing, we'll still insert target again to ensure order
-        insert_lines.append("//@target illustrator")
-    insert_lines.append(LOADER_STANDALONE)
-    if not has_pref:
-        insert_lines.append("app.preferences.setBooleanPreference('ShowExternalJSXWarning', false);")
-
-    block = "\n" + "\n".join(insert_lines) + "\n"
-    text = text[:insert_pos] + block + text[insert_pos:]
-    return text if text != original else original
+    block = CANONICAL_BLOCK if mpref is None else TARGET_LINE + "\n" + LOADER_STANDALONE + "\n"
+    return "".join((text[:insert_pos], "\n", block, text[insert_pos:]))
 
 
 def extract_cfg_script_name(text: str) -> str:
-    m = re.search(r"scriptName\s*:\s*([\'\"])(.*?)\1", text)
+    m = SCRIPTNAME_RE.search(text)
     return m.group(2) + " error" if m else "Script error"
 
 
 def build_execute_block(doc_check: str | None, sel_check: str | None, error_title: str, validate_block: str | None) -> str:
-    lines = []
-    lines.append("\n// ============================================================================")
-    lines.append("// EXECUTE")
-    lines.append("// ============================================================================\n")
-
     if validate_block:
         # Use validation pattern (SCRIPT/validateEnvironment)
-        lines.append("var validation = validateEnvironment();")
-        lines.append("if (!validation.valid) {")
         # Keep alert from validate_block if available, else a sane default
-        m_alert = re.search(r"alert\((.*?)\);", validate_block, re.S)
-        if m_alert:
-            lines.append("    alert(" + m_alert.group(1).strip() + ");")
-        else:
-            lines.append("    alert('Validation failed.');")
-        lines.append("} else {")
-        lines.append("    try {")
-        lines.append("        main();")
-        lines.append("    } catch (e) {")
-        lines.append("        AIS.Error.show('" + error_title + "', e);")
-        lines.append("    }")
-        lines.append("}")
-        return "\n".join(lines) + "\n"
-
+        m_alert = VALIDATE_ALERT_RE.search(validate_block)
+        alert = "alert(" + m_alert.group(1).strip() + ");" if m_alert else "alert('Validation failed.');"
+        guard = "var validation = validateEnvironment();\nif (!validation.valid) {\n    " + alert + "\n} else {\n"
     # Non-validation paths: use document/selection checks if present
-    if doc_check and sel_check:
-        lines.append("if (!AIS.Document.hasDocument()) {")
-        lines.append("    " + doc_check)
-        lines.append("} else if (!AIS.Document.hasSelection()) {")
-        lines.append("    " + sel_check)
-        lines.append("} else {")
+    elif doc_check and sel_check:
+        guard = (
+            "if (!AIS.Document.hasDocument()) {\n    " + doc_check
+            + "\n} else if (!AIS.Document.hasSelection()) {\n    " + sel_check + "\n} else {\n"
+        )
     elif doc_check:
-        lines.append("if (!AIS.Document.hasDocument()) {")
-        lines.append("    " + doc_check)
-        lines.append("} else {")
+        guard = "if (!AIS.Document.hasDocument()) {\n    " + doc_check + "\n} else {\n"
     elif sel_check:
-        lines.append("if (!AIS.Document.hasSelection()) {")
-        lines.append("    " + sel_check)
-        lines.append("} else {")
+        guard = "if (!AIS.Document.hasSelection()) {\n    " + sel_check + "\n} else {\n"
     else:
         # No checks, just execute
-        lines.append("try {")
-        lines.append("    main();")
-        lines.append("} catch (e) {")
-        lines.append("    AIS.Error.show('" + error_title + "', e);")
-        lines.append("}")
-        return "\n".join(lines) + "\n"
+        return EXECUTE_HEADER + UNGUARDED_MAIN.format(error_title)
 
-    lines.append("    try {")
-    lines.append("        main();")
-    lines.append("    } catch (e) {")
-    lines.append("        AIS.Error.show('" + error_title + "', e);")
-    lines.append("    }")
-    lines.append("}")
-
-    return "\n".join(lines) + "\n"
+    return "".join((EXECUTE_HEADER, guard, GUARDED_MAIN.format(error_title)))
 
 
 def strip_returns(s: str) -> str:
     # Remove any 'return;' from a block that will be moved to top-level
-    return re.sub(r"\breturn\s*;", "", s)
+    return RETURN_RE.sub("", s)
 
 
 def remove_wrapper_and_build_execute(text: str) -> tuple[str, bool]:
@@ -152,41 +139,44 @@ def remove_wrapper_and_build_execute(text: str) -> tuple[str, bool]:
     Returns (new_text, changed).
     """
     original = text
-
-    # Find any IIFE that calls main()
-    all_iifes = list(re.finditer(r"\(function\(\)\s*\{([\s\S]*?)\}\)\(\);", text))
-    if not all_iifes:
+    if "(function()" not in text:
         return original, False
 
+    # Find any IIFE that calls main(), stopping at the first hit
     chosen = None
-    for mm in all_iifes:
-        if re.search(r"\bmain\s*\(\s*\)\s*;", mm.group(1)):
+    first = None
+    for mm in IIFE_RE.finditer(text):
+        if first is None:
+            first = mm
+        if MAIN_CALL_RE.search(mm.group(1)):
             chosen = mm
             break
     if chosen is None:
         # fallback to first IIFE
-        chosen = all_iifes[0]
+        chosen = first
+    if chosen is None:
+        return original, False
 
     content = chosen.group(1)
 
     # Detect validation-based wrappers
     validate_block = None
-    if re.search(r"validateEnvironment\s*\(\s*\)", content):
+    if VALIDATE_RE.search(content):
         validate_block = content
 
     # Extract doc/select alert blocks if present
     doc_check = None
     sel_check = None
 
-    m_doc = re.search(r"if\s*\(\s*!\s*AIS\.Document\.hasDocument\(\)\s*\)\s*\{([\s\S]*?)\}", content)
+    m_doc = DOC_GUARD_RE.search(content)
     if m_doc:
-        alert_doc = re.search(r"alert\((.*?)\)\s*;", m_doc.group(1), re.S)
+        alert_doc = ALERT_RE.search(m_doc.group(1))
         if alert_doc:
             doc_check = strip_returns("alert(" + alert_doc.group(1).strip() + ");")
 
-    m_sel = re.search(r"if\s*\(\s*!\s*AIS\.Document\.hasSelection\(\)\s*\)\s*\{([\s\S]*?)\}", content)
+    m_sel = SEL_GUARD_RE.search(content)
     if m_sel:
-        alert_sel = re.search(r"alert\((.*?)\)\s*;", m_sel.group(1), re.S)
+        alert_sel = ALERT_RE.search(m_sel.group(1))
         if alert_sel:
             sel_check = strip_returns("alert(" + alert_sel.group(1).strip() + ");")
 
@@ -199,43 +189,53 @@ def remove_wrapper_and_build_execute(text: str) -> tuple[str, bool]:
 
     # Append EXECUTE block
     exec_block = build_execute_block(doc_check, sel_check, error_title, validate_block)
-    text = text.rstrip() + "\n" + exec_block
+    text = "".join((text.rstrip(), "\n", exec_block))
 
     return text, text != original
 
 
 def process_jsx_file(p: Path) -> bool:
-    text = read_text(p)
-    changed = False
+    original = read_text(p)
 
     # Step 1: target/loader/pref ordering
-    new_text = ensure_target_and_loader(text)
-    if new_text != text:
-        text = new_text
-        changed = True
+    text = ensure_target_and_loader(original)
 
     # Step 2: remove validation wrapper IIFE and append EXECUTE block
     text2, changed2 = remove_wrapper_and_build_execute(text)
     if changed2:
         text = text2
-        changed = True
 
-    if changed:
-        write_text(p, text)
-    return changed
+    # Compare with what was read (str == checks identity and length first) so a
+    # round-trip to identical content never rewrites the file or bumps its mtime
+    if text == original:
+        return False
+    write_text(p, text)
+    return True
+
+
+def iter_jsx(root: str | Path) -> Iterator[Path]:
+    """Yield .jsx files under root, reusing scandir's cached entry types (symlinked dirs are not followed)."""
+    try:
+        it = os.scandir(root)
+    except OSError:
+        # Like os.walk without onerror: skip directories that cannot be scanned
+        return
+    with it:
+        for entry in it:
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                is_dir = False
+            if is_dir:
+                yield from iter_jsx(entry.path)
+            elif entry.name.endswith('.jsx'):
+                yield Path(entry.path)
 
 
 def main():
-    count = 0
-    files = 0
-    for root, _, filenames in os.walk(ROOT):
-        for fn in filenames:
-            if fn.endswith('.jsx'):
-                files += 1
-                p = Path(root) / fn
-                if process_jsx_file(p):
-                    count += 1
-    print(f"Processed {files} .jsx files; modified {count}.")
+    paths = list(iter_jsx(ROOT))
+    count = sum(map(process_jsx_file, paths))
+    print(f"Processed {len(paths)} .jsx files; modified {count}.")
 
 
 if __name__ == "__main__":